@@ -1,13 +1,22 @@
 import re
 import yaml
+try:
+    from yaml import CSafeLoader as SafeLoader
+except ImportError:
+    from yaml import SafeLoader
 from pathlib import Path
-from datetime import datetime, time, timedelta 
+from datetime import datetime, date, time, timedelta 
 from aiogram import Bot, Dispatcher, types
 from aiogram.filters import Command
 from aiogram.client.default import DefaultBotProperties
 import asyncio
 import logging
+import os
+from collections import defaultdict
+from dataclasses import dataclass
+from functools import lru_cache
 from aiogram.enums import ParseMode
+from watchfiles import awatch, Change
 
 
 logging.basicConfig(level=logging.INFO)
@@ -15,10 +24,25 @@ logger = logging.getLogger(__name__)
 
 CONFIG_FILE = 'config.yaml'
 
+# Регулярные выражения для разбора строк задач
+# Строки задач в байтах файла, ищутся по всему файлу сразу
+_TASK_LINE_RE = re.compile(rb'(?m)^[ \t]*- \[ \][^\n]*')
+_TASK_RE = re.compile(r'^- \[ \]\s*(?P<body>.*?)(?:#.*)?$')
+# Время/даты задачи: ⏰HH:MM, ⏳YYYY-MM-DD, 📅YYYY-MM-DD и HH:MM в начале текста
+_ATTR_RE = re.compile(
+    r'⏰\s*(?P<clock>\d{1,2}:\d{2})(?!\d)'
+    r'|⏳\s*(?P<pre>\d{4}-\d{1,2}-\d{1,2})(?!\d)'
+    r'|📅\s*(?P<post>\d{4}-\d{1,2}-\d{1,2})(?!\d)'
+    r'|^(?P<lead>\d{1,2}:\d{2})(?=\s|$)'
+)
+_LEADING_TIME_RE = re.compile(r'\d{1,2}:\d{2}(?=\s|$)')
+_VALID_TIME_RE = re.compile(r'\d{1,2}:\d{2}')
+_VALID_DATE_RE = re.compile(r'\d{4}-\d{1,2}-\d{1,2}')
+
 def load_config():
     try:
         with open(CONFIG_FILE, 'r', encoding='utf-8') as f:
-            config = yaml.safe_load(f)
+            config = yaml.load(f, Loader=SafeLoader)
         
         required_keys = ['bot_token', 'directory', 'default_time', 'user_chat_id', 'check_interval']
         missing = [k for k in required_keys if k not in config]
@@ -32,6 +56,10 @@ def load_config():
 
         config.setdefault('files', []) 
         config.setdefault('show_path_in_message', True) 
+        config.setdefault('force_polling', False)
+
+        # Абсолютный путь, чтобы совпадал с путями из событий watchfiles
+        config['directory'] = str(Path(config['directory']).resolve())
 
         return config
     except Exception as e:
@@ -49,60 +77,63 @@ bot = Bot(
 
 dp = Dispatcher()
 
+@lru_cache(maxsize=2048)
+def _parse_time(s):
+    return datetime.strptime(s, '%H:%M').time().replace(second=0, microsecond=0)
+
+@lru_cache(maxsize=8192)
+def _parse_date(s):
+    return datetime.strptime(s, '%Y-%m-%d').date()
+
+def _is_valid_time(t):
+    return _VALID_TIME_RE.fullmatch(t) is not None
+
+def _is_valid_date(d):
+    # Дешёвая проверка формата, strptime только для отсева дат вроде 2025-13-40
+    if not _VALID_DATE_RE.fullmatch(d):
+        return False
+    try:
+        _parse_date(d)
+        return True
+    except ValueError:
+        return False
+
 def parse_task_line(line, default_time):
-    line = line.strip().split('#')[0].strip()
-    
-    if not re.match(r'^- \[ \]', line):
+    task_match = _TASK_RE.match(line.strip())
+    if not task_match:
         return None
-    
-    content = re.sub(r'^- \[ \]\s*', '', line)
-    
-    time_start = None
-    elements = {}
-    task_text = []
-
-    parts = re.split(r'(\s*[⏰⏳📅]\s*)', content)
-    for i, part in enumerate(parts):
-        if re.match(r'^\s*[⏰⏳📅]\s*$', part):
-            emoji = part.strip()
-            if i+1 < len(parts):
-                value = parts[i+1].split()[0] if parts[i+1] else None
-                if value and re.match(r'^[\d:-]+$', value):
-                    elements[emoji] = value
-                    parts[i+1] = parts[i+1].replace(value, '', 1).strip()
-        else:
-            task_text.append(part.strip())
 
-    if task_text:
-        first_part = task_text[0]
-        time_match = re.match(r'^(\d{1,2}:\d{2})(\s+|$)', first_part)
-        if time_match:
-            time_start = time_match.group(1)
-            task_text[0] = first_part.replace(time_match.group(0), '', 1).strip()
+    content = task_match.group('body')
+    elements = {}
 
-    task_clean = ' '.join(filter(None, task_text))
-    time_clock = elements.get('⏰')
-    
-    def is_valid_time(t):
-        return re.fullmatch(r'\d{1,2}:\d{2}', t) is not None
-    
-    def is_valid_date(d):
-        try:
-            datetime.strptime(d, '%Y-%m-%d')
-            return True
-        except:
-            return False
+    if '⏰' not in content and '⏳' not in content and '📅' not in content:
+        # Без эмодзи в строке может быть только время в начале текста
+        lead = _LEADING_TIME_RE.match(content)
+        if lead:
+            elements['lead'] = lead.group()
+            content = content[lead.end():]
+        task_clean = ' '.join(content.split())
+    else:
+        # Вырезаем время и даты из текста за один проход
+        pieces = []
+        pos = 0
+        for match in _ATTR_RE.finditer(content):
+            elements[match.lastgroup] = match.group(match.lastgroup)
+            pieces.append(content[pos:match.start()])
+            pos = match.end()
+        pieces.append(content[pos:])
+        task_clean = ' '.join(''.join(pieces).split())
     
     final_time = next(
-        (t for t in [time_clock, time_start, default_time] 
-        if t and is_valid_time(t)),
+        (t for t in [elements.get('clock'), elements.get('lead'), default_time] 
+        if t and _is_valid_time(t)),
         default_time
     )
     
     valid_dates = {}
-    for emoji in ['⏳', '📅']:
-        value = elements.get(emoji)
-        if value and is_valid_date(value):
+    for emoji, key in [('⏳', 'pre'), ('📅', 'post')]:
+        value = elements.get(key)
+        if value and _is_valid_date(value):
             valid_dates[emoji] = value
 
     return {
@@ -111,80 +142,341 @@ def parse_task_line(line, default_time):
         'dates': valid_dates
     } if task_clean else None
 
-async def check_files(config):
-    results = []
+@dataclass(slots=True)
+class Task:
+    """Задача из кэша с заранее разобранными временем и датами"""
+    file: Path
+    display_name: str
+    line: int
+    text: str
+    time_str: str
+    time: time | None
+    pre_date: date | None
+    post_date: date | None
+
+# Кэш задач: путь к файлу -> ((st_mtime_ns, st_size), список Task из этого файла)
+TASK_CACHE = {}
+
+# Все md-файлы хранилища; обходится один раз, дальше обновляется по событиям
+_MD_INDEX = set()
+
+# Расписание, собираемое из кэша: (время, дата) -> задачи, время -> задачи без дат
+_SCHEDULE_PRE = defaultdict(list)
+_SCHEDULE_POST = defaultdict(list)
+_SCHEDULE_PLAIN = defaultdict(list)
+
+# Задачи для /scheduled: дата -> задачи, и отдельно задачи без дат
+_BY_DATE = defaultdict(list)
+_BY_DATE_NONE = []
+
+# Ограничения Telegram: длина сообщения и число одновременных запросов
+MESSAGE_LIMIT = 4096
+MESSAGE_SEPARATOR = "\n\n━━━\n\n"
+_SEND_SEMAPHORE = asyncio.Semaphore(5)
+
+# Период планировщика: время задач указывается с точностью до минуты
+SCHEDULER_PERIOD = 60
+
+def _scan_md_files(root):
+    """Находит md-файлы через os.scandir, пропуская скрытые папки (.obsidian, .trash)"""
+    found = set()
+    stack = [root]
+    while stack:
+        try:
+            with os.scandir(stack.pop()) as entries:
+                for entry in entries:
+                    if entry.name.startswith('.'):
+                        continue
+                    if entry.is_dir(follow_symlinks=False):
+                        stack.append(entry.path)
+                    elif entry.name.endswith('.md'):
+                        found.add(Path(entry.path))
+        except OSError as e:
+            logger.warning(f"Не удалось прочитать папку: {str(e)}")
+    return found
+
+def _files_to_scan():
     directory = Path(config['directory'])
     files = config.get('files', [])
 
     if not files:  
-        files_to_scan = list(directory.rglob("*.md")) 
-    else:
-        files_to_scan = [directory / f for f in files]
+        return _scan_md_files(config['directory'])
+    return {directory / f for f in files}
 
-    for filepath in files_to_scan:
-        if not filepath.exists():
-            logger.warning(f"Файл не найден: {filepath}")
-            continue
+def _make_task(filepath, display_name, line_num, task_data):
+    try:
+        task_time = _parse_time(task_data['time'])
+    except ValueError:
+        logger.warning(f"Некорректное время {task_data['time']} в {filepath}:{line_num}")
+        task_time = None
+
+    dates = task_data['dates']
+    return Task(
+        file=filepath,
+        display_name=display_name,
+        line=line_num,
+        text=task_data['task'],
+        time_str=task_data['time'],
+        time=task_time,
+        pre_date=_parse_date(dates['⏳']) if '⏳' in dates else None,
+        post_date=_parse_date(dates['📅']) if '📅' in dates else None
+    )
+
+def _read_and_parse(filepath, default_time, cached_stamp=None):
+    """Читает и разбирает файл (выполняется в отдельном потоке).
+    Возвращает ((st_mtime_ns, st_size), задачи) или None, если отметка совпала с cached_stamp"""
+    # Файл открывается сразу, а mtime берётся у дескриптора: одно обращение по пути вместо двух
+    with open(filepath, 'rb') as f:
+        st = os.fstat(f.fileno())
+        stamp = (st.st_mtime_ns, st.st_size)
+        if stamp == cached_stamp:
+            return None
 
+        # Файл читается целиком и сразу закрывается: отображение в память (mmap)
+        # на Windows не даёт Obsidian обрезать файл при сохранении
+        data = f.read()
+
+    # Имя файла для сообщений считается один раз на файл
+    display_name = str(filepath.relative_to(config['directory'])).removesuffix('.md')
+
+    tasks = []
+    line_num = 1
+    pos = 0
+    # Декодируются только строки задач, остальной текст в Python не попадает
+    for match in _TASK_LINE_RE.finditer(data):
+        line_num += data.count(b'\n', pos, match.start())
+        pos = match.start()
+        task_data = parse_task_line(match.group().decode('utf-8'), default_time)
+        if task_data:
+            tasks.append(_make_task(filepath, display_name, line_num, task_data))
+    return stamp, tasks
+
+async def _reparse_file(filepath, skip_unchanged=False):
+    """Перечитывает файл и обновляет его задачи в кэше.
+    skip_unchanged: не разбирать файл, если mtime и размер совпали с кэшем. Только для
+    полного перескана: на ФС с грубыми отметками времени (FAT, SMB) два сохранения подряд
+    могут дать одинаковый mtime, поэтому файлы из событий наблюдателя читаются всегда"""
+    cached = TASK_CACHE.get(filepath)
+    try:
+        result = await asyncio.to_thread(
+            _read_and_parse, filepath, config['default_time'],
+            cached[0] if skip_unchanged and cached else None
+        )
+    except FileNotFoundError:
+        logger.warning(f"Файл не найден: {filepath}")
+        TASK_CACHE.pop(filepath, None)
+        return
+    except OSError as e:
+        logger.error(f"Ошибка доступа к файлу {filepath}: {str(e)}")
+        return
+    except Exception as e:
+        logger.error(f"Ошибка чтения файла {filepath}: {str(e)}")
+        return
+
+    # Кэш меняется только из потока событийного цикла
+    if result:
+        TASK_CACHE[filepath] = result
+
+def _drop_path(path):
+    """Удаляет из индекса и кэша файл или все файлы удалённой папки"""
+    for filepath in list(_MD_INDEX):
+        if filepath == path or path in filepath.parents:
+            _MD_INDEX.discard(filepath)
+            TASK_CACHE.pop(filepath, None)
+
+async def _load_cache():
+    _MD_INDEX.clear()
+    _MD_INDEX.update(await asyncio.to_thread(_files_to_scan))
+    for filepath in list(TASK_CACHE):
+        if filepath not in _MD_INDEX:
+            del TASK_CACHE[filepath]
+
+    # Неизменённые файлы повторно не разбираются
+    await asyncio.gather(*(_reparse_file(filepath, skip_unchanged=True) for filepath in _MD_INDEX))
+    _rebuild_schedule()
+    logger.info(f"Загружено задач: {len(check_files())} из {len(TASK_CACHE)} файлов")
+
+def _watch_filter(change, path):
+    if config['files']:
+        return Path(path) in _files_to_scan()
+    # Путь события всегда начинается с папки хранилища, поэтому хватает среза
+    if os.sep + '.' in path[len(config['directory']):]:
+        return False
+    # Удаление/создание папок тоже нужно, чтобы обновить индекс целиком
+    return path.endswith('.md') or change != Change.modified
+
+async def _file_watch_loop():
+    """Обновление кэша задач по событиям файловой системы"""
+    while True:
         try:
-            with open(filepath, 'r', encoding='utf-8') as f:
-                for line_num, line in enumerate(f, 1):
-                    task_data = parse_task_line(line, config['default_time'])
-                    if task_data:
-                        results.append({
-                            'file': filepath, 
-                            'line': line_num,
-                            'data': task_data
-                        })
+            async for changes in awatch(
+                config['directory'],
+                watch_filter=_watch_filter,
+                force_polling=config['force_polling']
+            ):
+                to_parse = set()
+                for change, path in changes:
+                    filepath = Path(path)
+                    if change == Change.deleted:
+                        _drop_path(filepath)
+                    elif filepath.is_dir():
+                        to_parse.update(await asyncio.to_thread(_scan_md_files, path))
+                    elif filepath.suffix == '.md':
+                        to_parse.add(filepath)
+
+                _MD_INDEX.update(to_parse)
+                await asyncio.gather(*(_reparse_file(filepath) for filepath in to_parse))
+                _rebuild_schedule()
+                logger.debug(f"Обновлены файлы: {to_parse}")
+
         except Exception as e:
-            logger.error(f"Ошибка чтения файла {filepath}: {str(e)}")
+            logger.error(f"Ошибка отслеживания файлов: {str(e)}")
+            await asyncio.sleep(10)
+            # Пока наблюдатель не работал, события могли потеряться
+            await _load_cache()
+
+def check_files():
+    return [task for _, tasks in TASK_CACHE.values() for task in tasks]
+
+def _rebuild_schedule():
+    """Пересобирает расписание после изменения кэша задач"""
+    _SCHEDULE_PRE.clear()
+    _SCHEDULE_POST.clear()
+    _SCHEDULE_PLAIN.clear()
+    _BY_DATE.clear()
+    _BY_DATE_NONE.clear()
+    _format_scheduled.cache_clear()
+
+    # Файлы по порядку, чтобы задачи в сообщениях не перемешивались
+    for filepath in sorted(TASK_CACHE):
+        for task in TASK_CACHE[filepath][1]:
+            pre_date = task.pre_date
+            post_date = task.post_date
+            if pre_date:
+                _BY_DATE[pre_date].append(task)
+            if post_date and post_date != pre_date:
+                _BY_DATE[post_date].append(task)
+            if not pre_date and not post_date:
+                _BY_DATE_NONE.append(task)
+
+            task_time = task.time
+            if task_time is None:
+                continue
+            if pre_date:
+                _SCHEDULE_PRE[(task_time, pre_date)].append(task)
+            if post_date:
+                _SCHEDULE_POST[(task_time, post_date)].append(task)
+            if not pre_date and not post_date:
+                _SCHEDULE_PLAIN[task_time].append(task)
+
+def _format_task_message(task, message):
+    if config.get('show_path_in_message', True):
+        message += f"\n📁 Файл: {task.display_name}"
+    return message
+
+def _tg_len(text):
+    """Длина текста так, как её считает Telegram: в единицах UTF-16"""
+    return len(text.encode('utf-16-le')) // 2
+
+def _split_long_message(message):
+    """Делит слишком длинное сообщение по строкам; строку режет только если она сама длиннее лимита"""
+    pieces = []
+    current = ""
+    for line in message.split('\n'):
+        while _tg_len(line) > MESSAGE_LIMIT:
+            cut = MESSAGE_LIMIT
+            while _tg_len(line[:cut]) > MESSAGE_LIMIT:
+                # Символ занимает 1 или 2 единицы UTF-16, поэтому убираем не меньше половины избытка
+                cut -= (_tg_len(line[:cut]) - MESSAGE_LIMIT + 1) // 2
+            if current:
+                pieces.append(current)
+                current = ""
+            pieces.append(line[:cut])
+            line = line[cut:]
+
+        candidate = f"{current}\n{line}" if current else line
+        if _tg_len(candidate) <= MESSAGE_LIMIT:
+            current = candidate
+        else:
+            pieces.append(current)
+            current = line
+
+    if current:
+        pieces.append(current)
+    return pieces
+
+def _pack_messages(messages):
+    """Склеивает сообщения в как можно меньшее число частей не длиннее MESSAGE_LIMIT.
+    Возвращает список (текст части, сообщения в ней)"""
+    chunks = []
+    current = []
+    current_len = 0
+    separator_len = _tg_len(MESSAGE_SEPARATOR)
+    for message in messages:
+        message_len = _tg_len(message)
+        if current and current_len + separator_len + message_len <= MESSAGE_LIMIT:
+            current.append(message)
+            current_len += separator_len + message_len
+            continue
+
+        if current:
+            chunks.append((MESSAGE_SEPARATOR.join(current), current))
+            current = []
+
+        if message_len > MESSAGE_LIMIT:
+            chunks.extend((piece, [piece]) for piece in _split_long_message(message))
+        else:
+            current = [message]
+            current_len = message_len
 
-    return results
+    if current:
+        chunks.append((MESSAGE_SEPARATOR.join(current), current))
+    return chunks
+
+async def _send_text(text):
+    try:
+        async with _SEND_SEMAPHORE:
+            await bot.send_message(
+                chat_id=config['user_chat_id'],
+                text=text,
+                parse_mode=ParseMode.HTML,
+                disable_web_page_preview=True
+            )
+        logger.info(f"Отправлено сообщение: {text}")
+        return True
+
+    except Exception as e:
+        logger.error(f"Ошибка отправки сообщения: {str(e)}")
+        return False
+
+async def _send_messages(messages):
+    for text, parts in _pack_messages(messages):
+        # Одна ошибка (например, в разметке задачи) не должна терять всю пачку
+        if not await _send_text(text) and len(parts) > 1:
+            for part in parts:
+                await _send_text(part)
 
 async def process_tasks_for_time(check_time: datetime):
-    tasks = await check_files(config)
     current_date = check_time.date()
     current_time = check_time.time().replace(second=0, microsecond=0)
+    messages = []
     
-    for task in tasks:
-        try:
-            data = task['data']
-            task_text = data["task"]
-            time_str = data["time"]
-            predate = data["dates"].get("⏳")
-            postdate = data["dates"].get("📅")
-            
-            task_time = datetime.strptime(time_str, '%H:%M').time()
-            task_time = task_time.replace(second=0, microsecond=0)
-
-            if task_time == current_time:
-                message = None
-                
-                if predate and datetime.strptime(predate, '%Y-%m-%d').date() == current_date:
-                    message = f"⏳ Напоминаю {postdate} у вас запланировано:\n\n - {task_text}"
-                
-                elif postdate and datetime.strptime(postdate, '%Y-%m-%d').date() == current_date:
-                    message = f"📅 Напоминание:\n\n - {task_text}"
-                
-                elif not predate and not postdate:
-                    message = f"⏰ Напоминание:\n\n - {task_text}"
-                
-                if message:
-                    if config.get('show_path_in_message', True):
-                        filename = task['file'].relative_to(config['directory'])
-                        safe_filename = str(filename).replace(".md", "") 
-                        message += f"\n📁 Файл: {safe_filename}"
-                                            
-                    await bot.send_message(
-                        chat_id=config['user_chat_id'],
-                        text=message,
-                        parse_mode=ParseMode.HTML,
-                        disable_web_page_preview=True
-                    )
-                    logger.info(f"Отправлено сообщение: {message}")
+    for task in _SCHEDULE_PRE.get((current_time, current_date), ()):
+        messages.append(_format_task_message(
+            task, f"⏳ Напоминаю {task.post_date} у вас запланировано:\n\n - {task.text}"
+        ))
+
+    for task in _SCHEDULE_POST.get((current_time, current_date), ()):
+        # Если сегодня и напоминание ⏳, задача уже отправлена выше
+        if task.pre_date == current_date:
+            continue
+        messages.append(_format_task_message(task, f"📅 Напоминание:\n\n - {task.text}"))
 
-        except Exception as e:
-            logger.error(f"Ошибка обработки задачи: {str(e)}")
+    for task in _SCHEDULE_PLAIN.get(current_time, ()):
+        messages.append(_format_task_message(task, f"⏰ Напоминание:\n\n - {task.text}"))
+
+    # Все задачи на одну минуту уходят одним сообщением
+    await _send_messages(messages)
 
 
 async def check_and_notify():
@@ -203,13 +495,13 @@ async def check_and_notify():
         missed_checks = int(time_diff // config['check_interval'])
         logger.warning(f"Пропущено проверок: {missed_checks}, восстановление...")
         
-        # Обработка пропущенных периодов
-        for i in range(1, missed_checks + 1):
-            check_time = check_and_notify.last_check_time + timedelta(
-                seconds=config['check_interval'] * i
-            )
-            logger.debug(f"Проверка за {check_time}")
-            await process_tasks_for_time(check_time)
+        # Обработка пропущенных периодов (отправка ограничена _SEND_SEMAPHORE)
+        check_times = [
+            check_and_notify.last_check_time + timedelta(seconds=config['check_interval'] * i)
+            for i in range(1, missed_checks + 1)
+        ]
+        logger.debug(f"Проверка за {check_times}")
+        await asyncio.gather(*(process_tasks_for_time(t) for t in check_times))
     
     # Обработка текущих задач
     logger.info(f"Обычная проверка в {now}")
@@ -218,26 +510,50 @@ async def check_and_notify():
     # Обновление времени последней проверки
     check_and_notify.last_check_time = now
 
+def _seconds_to_next_check():
+    """Сколько секунд по настенным часам осталось до ближайших xx:xx:01"""
+    now = datetime.now()
+    next_check = (
+        now.replace(second=1, microsecond=0) + 
+        timedelta(minutes=1) if now.second >= 1 else
+        now.replace(second=1, microsecond=0)
+    )
+    return (next_check - now).total_seconds()
+
 async def scheduler():
-    """Планировщик с синхронизацией по времени (например, каждую минуту в xx:xx:01)"""
+    """Планировщик с синхронизацией по времени (каждую минуту в xx:xx:01).
+    Сроки отсчитываются по монотонным часам цикла, поэтому задержки не накапливаются;
+    если настенные часы ушли от xx:xx:01 (сон, перевод часов), срок выравнивается заново"""
+    loop = asyncio.get_running_loop()
+    next_deadline = loop.time() + _seconds_to_next_check()
+    last_minute = None
+
     while True:
-        try:
-            now = datetime.now()
-            next_check = (
-                now.replace(second=1, microsecond=0) + 
-                timedelta(minutes=1) if now.second >= 1 else
-                now.replace(second=1, microsecond=0)
-            )
+        # После выравнивания минута могла уже быть проверена
+        minute = datetime.now().replace(second=0, microsecond=0)
+        if minute != last_minute:
+            try:
+                await check_and_notify()
+            except Exception as e:
+                logger.error(f"Ошибка в планировщике: {str(e)}")
+            last_minute = minute
 
-            await check_and_notify()
-            
-            sleep_duration = (next_check - datetime.now()).total_seconds()
-            logger.info(f"Следующая проверка через {sleep_duration:.2f} секунд (в {next_check.time()})")
-            await asyncio.sleep(sleep_duration)
+        # Если отстали больше чем на период, пропущенные минуты восстановит check_and_notify
+        current = loop.time()
+        if next_deadline <= current:
+            next_deadline += ((current - next_deadline) // SCHEDULER_PERIOD + 1) * SCHEDULER_PERIOD
 
-        except Exception as e:
-            logger.error(f"Ошибка в планировщике: {str(e)}")
-            await asyncio.sleep(10)
+        # Расхождение с настенными часами, приведённое к диапазону [-30, 30) секунд
+        wall_deadline = current + _seconds_to_next_check()
+        drift = (next_deadline - wall_deadline + SCHEDULER_PERIOD / 2) % SCHEDULER_PERIOD - SCHEDULER_PERIOD / 2
+        if abs(drift) > 1:
+            logger.warning(f"Расхождение с системными часами {drift:.2f} с, выравнивание по xx:xx:01")
+            next_deadline = wall_deadline
+
+        sleep_duration = next_deadline - current
+        logger.info(f"Следующая проверка через {sleep_duration:.2f} секунд")
+        await asyncio.sleep(sleep_duration)
+        next_deadline += SCHEDULER_PERIOD
 
 
 
@@ -258,11 +574,37 @@ async def send_welcome(message: types.Message):
         reply_markup=keyboard
     )
 
+@lru_cache(maxsize=1)
+def _format_scheduled(today, current_time):
+    """Текст ответа /scheduled на текущую минуту; кэш сбрасывается при пересборке расписания"""
+    # Задачи без дат показываются, пока не наступило их время
+    tasks = _BY_DATE.get(today, []) + [
+        task for task in _BY_DATE_NONE
+        if task.time is not None and task.time > current_time
+    ]
+    response = ["📅 <b>Задачи на сегодня:</b>\n"]
+    
+    for task in tasks:
+        file_info = ""
+        if config.get('show_path_in_message', True):
+            file_info += f"\n📁 Файл: {task.display_name} \n"
+
+        task_info = (
+            f"⏰ {task.time_str} - {task.text}\n"
+            f"{file_info}"
+            "━━━━━━━━━━━━━━━━━━━━━━"
+        )
+        response.append(task_info)
+    
+    if len(response) == 1:
+        response.append("\n✅ На сегодня задач нет!")
+
+    return '\n'.join(response)
+
 @dp.message(Command("scheduled"))
 @dp.message(lambda message: message.text == "🔔Задачи на сегодня")
 async def show_scheduled_tasks(message: types.Message):
-    tasks = await check_files(config)
-    today = datetime.now().date()
+    now = datetime.now()
     keyboard = types.ReplyKeyboardMarkup(
         keyboard=[
             [types.KeyboardButton(text="🔔Задачи на сегодня")]
@@ -270,55 +612,16 @@ async def show_scheduled_tasks(message: types.Message):
         resize_keyboard=True,
         one_time_keyboard=True
     )
-    response = ["📅 <b>Задачи на сегодня:</b>\n"]
-    
-    for task in tasks:
-        data = task['data']
-        dates = data['dates']
-        time_str = data['time']
-        
-        # Проверяем совпадение дат
-        is_today = False
-        if '⏳' in dates:
-            remind_date = datetime.strptime(dates['⏳'], '%Y-%m-%d').date()
-            if remind_date == today:
-                is_today = True
-        if '📅' in dates:
-            event_date = datetime.strptime(dates['📅'], '%Y-%m-%d').date()
-            if event_date == today:
-                is_today = True
-        if not dates:
-            try:
-                task_time = datetime.strptime(time_str, '%H:%M').time()
-                if task_time >= datetime.now().time():
-                    is_today = True
-            except:
-                pass
-        
-        if is_today:
-            file_info = ""
-            if config.get('show_path_in_message', True):
-                filename = task['file'].relative_to(config['directory'])
-                safe_filename = str(filename).replace(".md", "") 
-                file_info += f"\n📁 Файл: {safe_filename} \n"
-
-            task_info = (
-                f"⏰ {time_str} - {data['task']}\n"
-                f"{file_info}"
-                "━━━━━━━━━━━━━━━━━━━━━━"
-            )
-            response.append(task_info)
-    
-    if len(response) == 1:
-        response.append("\n✅ На сегодня задач нет!")
     
     await message.reply(
-        '\n'.join(response),
+        _format_scheduled(now.date(), now.time().replace(second=0, microsecond=0)),
         parse_mode=ParseMode.HTML,
         reply_markup=keyboard
     )
 
 async def main():
+    await _load_cache()
+    asyncio.create_task(_file_watch_loop())
     asyncio.create_task(scheduler())
     await dp.start_polling(bot)
 